@@ -5,7 +5,7 @@ If you aren't developing this plugin, you should not need to run this.
 """
 import http.client
 from html.parser import HTMLParser
-from pickle import dump
+from pickle import HIGHEST_PROTOCOL, dump
 from typing import Dict, List, Optional, SupportsInt, Tuple, Union, cast
 
 try:
@@ -146,7 +146,7 @@ def gen_instruction_info() -> None:
             insns[insn._opcode] = insn
 
     with open(INSTRUCTIONS_PICKLE_PATH, "bw") as f:
-        dump(insns, f)
+        dump(insns, f, protocol=HIGHEST_PROTOCOL)
 
 
 if __name__ == "__main__":
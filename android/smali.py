@@ -1,15 +1,22 @@
+import array
 import dataclasses
+import functools
+import io
 import pickle
 import re
+import sys
+import weakref
+from enum import IntEnum
 from pathlib import Path
-from struct import unpack
+from struct import Struct, unpack_from
 from typing import (
     NewType,
     TYPE_CHECKING,
     Any,
+    Callable,
     Dict,
     List,
-    Match,
+    Optional,
     Tuple,
     Union,
     cast,
@@ -39,8 +46,83 @@ if TYPE_CHECKING:
 PICKLE_FILENAME = "instruction_data.pickle"
 INSTRUCTIONS_PICKLE_PATH = Path(__file__).resolve().parent / PICKLE_FILENAME
 
+# Constant pool kind in 35c syntax strings, e.g. "meth" in "meth@BBBB"
+_KIND_RE = re.compile("\\s([a-z_]+)@")
 
-@dataclasses.dataclass
+# __slots__ make attribute access faster and instances smaller, but dataclass()
+# can only generate them on Python 3.10+
+_SLOTS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+def _setstate(self: Any, state: Any) -> None:
+    """__setstate__ for pickles made with and without __slots__.
+
+    Objects with __slots__ pickle their state as (None, slots) and others as
+    a plain dict.
+    """
+    if isinstance(state, tuple):
+        state = {**(state[0] or {}), **state[1]}
+    for name, value in state.items():
+        setattr(self, name, value)
+
+
+# Pre-tokenized syntax string. See compile_syntax()
+SyntaxProgram = List[Tuple[str, Optional[str], int, bool]]
+
+
+class OperandKind(IntEnum):
+    """How an operand in a syntax string is tokenized. See compile_operand()"""
+
+    EMPTY = 0
+    REGISTER = 1
+    LITERAL = 2
+    OFFSET = 3
+    RANGE = 4
+    CALL_SITE = 5
+    FIELD = 6
+    METHOD = 7
+    METHOD_HANDLE = 8
+    PROTO = 9
+    STRING = 10
+    TYPE = 11
+    UNKNOWN_LOOKUP = 12
+    OTHER = 13
+
+
+@dataclasses.dataclass(**_SLOTS)
+class SmaliOperand:
+    """Operand of a syntax string, compiled by compile_operand()
+
+    Example:
+        syntax: "{vC,"
+        kind: OperandKind.REGISTER
+        program: [("v", "C", 1, False)]
+        letter: "C"
+        size: 1
+        shift: 0
+        lookup_type: ""
+        leading_brace: True
+        trailing_brace: False
+        trailing_comma: True
+    """
+
+    syntax: str
+    kind: OperandKind
+    # Operand without braces and comma
+    program: SyntaxProgram
+    # The argument for kinds that have a single value
+    letter: str
+    size: int
+    # Literals like #+BBBB0000 are shifted left
+    shift: int
+    # Text before "@" for lookups
+    lookup_type: str
+    leading_brace: bool
+    trailing_brace: bool
+    trailing_comma: bool
+
+
+@dataclasses.dataclass(**_SLOTS)
 class SmaliInstructionFormat:
     """Row of https://source.android.com/devices/tech/dalvik/instruction-formats#formats
 
@@ -61,9 +143,15 @@ class SmaliInstructionFormat:
     insn_len: int
     num_regs: int
     typecode: str
+    # Generated from format_ by load_insns()
+    _parser: Callable[[bytes], Dict[str, int]] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+
+    __setstate__ = _setstate
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**_SLOTS)
 class SmaliInstructionInfo:
     """Row of https://source.android.com/devices/tech/dalvik/dalvik-bytecode#instructions
 
@@ -84,9 +172,20 @@ class SmaliInstructionInfo:
     syntax: str
     arguments: str
     description: str
+    # Compiled from syntax by load_insns()
+    _operands: Tuple[SmaliOperand, ...] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+    # For instructions where the syntax depends on A, operands compiled from
+    # resolve_syntax() indexed by A. None means A is invalid
+    _operands_by_A: Optional[Tuple[Optional[Tuple[SmaliOperand, ...]], ...]] = (
+        dataclasses.field(init=False, repr=False, compare=False)
+    )
+
+    __setstate__ = _setstate
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**_SLOTS)
 class SmaliPackedSwitchPayload:
     _total_size: int
     size: int  # ushort
@@ -94,7 +193,7 @@ class SmaliPackedSwitchPayload:
     targets: List[int]
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**_SLOTS)
 class SmaliSparseSwitchPayload:
     _total_size: int
     size: int  # ushort
@@ -102,7 +201,7 @@ class SmaliSparseSwitchPayload:
     targets: List[int]
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**_SLOTS)
 class SmaliFillArrayDataPayload:
     _total_size: int
     element_width: int  # ushort
@@ -110,6 +209,40 @@ class SmaliFillArrayDataPayload:
     data: bytes  # ubyte
 
 
+@dataclasses.dataclass(**_SLOTS)
+class _OperandTokens:
+    """Operand tokens by index for one DexFile
+
+    Filled in by the _emit_* functions as instructions referencing them are
+    disassembled.
+    """
+
+    fields: Dict[int, List[InstructionTextToken]] = dataclasses.field(
+        default_factory=dict
+    )
+    methods: Dict[int, List[InstructionTextToken]] = dataclasses.field(
+        default_factory=dict
+    )
+    strings: Dict[int, List[InstructionTextToken]] = dataclasses.field(
+        default_factory=dict
+    )
+    types: Dict[int, InstructionTextToken] = dataclasses.field(default_factory=dict)
+
+
+# Kept out of DexFile so the parsed model only holds what's in the file. Entries
+# go away with their DexFile
+_operand_tokens: "weakref.WeakKeyDictionary[DexFile, _OperandTokens]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_operand_tokens(df: "DexFile") -> _OperandTokens:
+    cache = _operand_tokens.get(df)
+    if cache is None:
+        cache = _operand_tokens[df] = _OperandTokens()
+    return cache
+
+
 PseudoInstructions = NewType(
     "PseudoInstructions",
     Dict[
@@ -129,6 +262,9 @@ def slice_nibbles(data: bytes, start_nibble: int, size: int = 1) -> int:
     This function is only designed to work with current instruction formats. It
     makes a number of assumptions about byte order and positioning for these
     specific cases.
+
+    Disassembly doesn't call this. compile_format() generates the same
+    arithmetic inline (see _nibble_expr).
     """
     if size == 1:
         # Single nibble
@@ -156,12 +292,14 @@ def sign(val: int, size: int) -> int:
     return -(val & mask) + (val & ~mask)
 
 
-def parse_with_format(data: bytes, fmt: str) -> Dict[str, int]:
-    """Extract values from nibbles using format string.
+def format_fields(fmt: str) -> List[Tuple[str, int, int]]:
+    """Split format string into (letter, start nibble, size in nibbles) fields.
 
-    See TestFormatParsing for examples
+    Nibbles are indexed into the instruction after its shorts have been
+    swapped to big-endian, which is the order the format strings are written
+    in.
     """
-    values = dict()
+    fields = list()
     nibble = 0
     continuation = ""
     for byte in fmt.split(" "):
@@ -179,18 +317,127 @@ def parse_with_format(data: bytes, fmt: str) -> Dict[str, int]:
             elif chunk == "ØØ":
                 nibble += 2
             elif chunk.isupper():
-                # Actually parse binary
-                values[chunk[0]] = slice_nibbles(data, nibble, len(chunk))
+                fields.append((chunk[0], nibble, len(chunk)))
                 nibble += len(chunk)
             else:
                 raise ValueError(f'failed reading format "{chunk}"')
 
+    return fields
+
+
+def parse_with_format(data: bytes, fmt: str) -> Dict[str, int]:
+    """Extract values from nibbles using format string.
+
+    See TestFormatParsing for examples
+    """
+    values = dict()
+    for letter, nibble, size in format_fields(fmt):
+        # Actually parse binary
+        values[letter] = slice_nibbles(data, nibble, size)
     return values
 
 
+def _nibble_expr(start_nibble: int, size: int) -> str:
+    """Python expression equivalent to slice_nibbles on unswapped data "d".
+
+    Byte i of the swapped data is byte i ^ 1 of the original little-endian
+    shorts, so the swap is folded into the indexing.
+    """
+    byte = start_nibble // 2
+    if size == 1:
+        if start_nibble % 2:
+            return f"(d[{byte ^ 1}] & 0xF)"
+        return f"(d[{byte ^ 1}] >> 4)"
+    elif size == 2:
+        return f"d[{byte ^ 1}]"
+    elif size == 4:
+        return f"(d[{byte + 1}] << 8 | d[{byte}])"
+    elif size == 8 or size == 16:
+        # The 2-byte values are ordered from low to high
+        units = " | ".join(
+            f"d[{byte + i + 1}] << {i * 8 + 8} | d[{byte + i}] << {i * 8}"
+            for i in range(0, size // 2, 2)
+        )
+        return f"({units})"
+    raise ValueError(f"unexpected field size: {size}")
+
+
+def compile_format(fmt: str) -> Callable[[bytes], Dict[str, int]]:
+    """Generate a parser equivalent to parse_with_format for a single format.
+
+    Unlike parse_with_format, the generated function takes the instruction as
+    it appears in the file (little-endian shorts), so no endian_swap_shorts is
+    needed. See TestFormatCompiling for examples
+    """
+    values = ", ".join(
+        f"{letter!r}: {_nibble_expr(nibble, size)}"
+        for letter, nibble, size in format_fields(fmt)
+    )
+    source = f"def parse(d):\n    return {{{values}}}\n"
+    namespace: Dict[str, Any] = dict()
+    exec(compile(source, fmt, "exec"), namespace)
+    return cast(Callable[[bytes], Dict[str, int]], namespace["parse"])
+
+
 def endian_swap_shorts(data: bytes) -> bytes:
     assert (len(data) % 2) == 0
-    return bytes([data[i + (((i + 1) % 2) * 2 - 1)] for i in range(len(data))])
+    shorts = array.array("H", data)
+    shorts.byteswap()
+    return shorts.tobytes()
+
+
+@functools.lru_cache(maxsize=128)
+def int_array_struct(size: int) -> Struct:
+    """Struct for unpacking an array of size little-endian signed ints."""
+    return Struct(f"<{size}i")
+
+
+def compile_syntax(syntax: str) -> SyntaxProgram:
+    """Split syntax string into literals and argument substitutions.
+
+    Each entry is (text, letter, size, signed). Literal text has a letter of
+    None. For substitutions, text is the character preceding the group of
+    capital letters, size is the number of letters in the group, and signed
+    says whether the value is sign extended (see format_args_with_syntax).
+
+    Example:
+        "vAA, #+BB" -> [("v", "A", 2, False), (", #", None, 0, False),
+                        ("+", "B", 2, True)]
+    """
+    program: SyntaxProgram = list()
+    literal_start = 0
+    i = 0
+    while i < len(syntax) - 1:
+        if syntax[i] == "\n" or not "A" <= syntax[i + 1] <= "Z":
+            i += 1
+            continue
+        end = i + 1
+        while end < len(syntax) and "A" <= syntax[end] <= "Z":
+            end += 1
+        if literal_start < i:
+            program.append((syntax[literal_start:i], None, 0, False))
+        # NOTE I think this is right, but it's not very clear in the docs
+        signed = syntax[i] not in "v@"
+        program.append((syntax[i], syntax[end - 1], end - i - 1, signed))
+        literal_start = i = end
+    if literal_start < len(syntax):
+        program.append((syntax[literal_start:], None, 0, False))
+    return program
+
+
+def format_args_with_program(args: Dict[str, int], program: SyntaxProgram) -> str:
+    """Format compiled syntax program with parsed arguments.
+
+    See format_args_with_syntax
+    """
+    return "".join(
+        [
+            text
+            if letter is None
+            else f"{text}{sign(args[letter], size) if signed else args[letter]:x}"
+            for text, letter, size, signed in program
+        ]
+    )
 
 
 def format_args_with_syntax(args: Dict[str, int], syntax: str) -> str:
@@ -213,197 +460,418 @@ def format_args_with_syntax(args: Dict[str, int], syntax: str) -> str:
     inserted in bare hexadecimal format. Further formatting is the
     responsibility of the calling function.
 
+    Instruction syntax strings are compiled once in load_insns(). This is
+    for one-off strings.
+
     See test case examples in TestFormattingArgsWithSyntax.
     """
+    return format_args_with_program(args, compile_syntax(syntax))
+
+
+# Punctuation tokens are never modified, so they're shared between instructions
+_TOK_SPACE = InstructionTextToken(InstructionTextTokenType.TextToken, " ")
+_TOK_LBRACE = InstructionTextToken(InstructionTextTokenType.TextToken, "{")
+_TOK_RBRACE = InstructionTextToken(InstructionTextTokenType.TextToken, "}")
+_TOK_COMMA = InstructionTextToken(InstructionTextTokenType.OperandSeparatorToken, ",")
+_TOK_ARROW = InstructionTextToken(InstructionTextTokenType.TextToken, "->")
+_TOK_COLON = InstructionTextToken(InstructionTextTokenType.TextToken, ":")
+_TOK_LPAREN = InstructionTextToken(InstructionTextTokenType.TextToken, "(")
+_TOK_RPAREN = InstructionTextToken(InstructionTextTokenType.TextToken, ")")
+_TOK_DOTDOT = InstructionTextToken(InstructionTextTokenType.TextToken, "..")
+_TOK_PLUS = InstructionTextToken(InstructionTextTokenType.TextToken, "+")
+_TOK_QUOTE = InstructionTextToken(InstructionTextTokenType.TextToken, '"')
+
+# Escapes for rendering strings on one line. Unlike "unicode-escape", this
+# leaves printable non-ASCII characters alone. parse_mutf8 can return lone
+# surrogates, which can't be encoded to UTF-8, so those are escaped too
+_ESCAPE_TABLE = str.maketrans(
+    {
+        **{
+            chr(c): chr(c).encode("unicode-escape").decode()
+            for c in [
+                *range(0x20),
+                *range(0x7F, 0xA0),
+                0x2028,
+                0x2029,
+                *range(0xD800, 0xE000),
+            ]
+        },
+        "\\": "\\\\",
+        '"': '\\"',
+    }
+)
 
-    def fmt(m: Match[str]) -> str:
-        val = args[m[0][-1]]
-        # NOTE I think this is right, but it's not very clear in the docs
-        if m[0][0] not in "v@":
-            # Signed
-            val = sign(val, len(m[0]) - 1)
-        return f"{m[0][0]}{val:x}"
 
-    return re.sub(".[A-Z]+", fmt, syntax)
+def escape_string(string_: str) -> str:
+    """Escape string for display between quotes, e.g. \n -> \\n"""
+    return string_.translate(_ESCAPE_TABLE)
 
 
-def tokenize_syntax(
-        df: "DexFile", word: str, args: Dict[str, int]
-) -> List[InstructionTextToken]:
-    tokens = list()
-    tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, " "))
+_LOOKUP_KINDS = {
+    "call_site": OperandKind.CALL_SITE,
+    "field": OperandKind.FIELD,
+    "meth": OperandKind.METHOD,
+    "method_handle": OperandKind.METHOD_HANDLE,
+    "proto": OperandKind.PROTO,
+    "string": OperandKind.STRING,
+    "type": OperandKind.TYPE,
+}
+
+
+def compile_operand(word: str) -> SmaliOperand:
+    """Work out how to tokenize one word of a syntax string.
+
+    The kind of operand only depends on the syntax, so this is done once per
+    instruction in load_insns() instead of on the formatted operand for every
+    disassembled instruction. Operands that don't match one of the expected
+    shapes are OperandKind.OTHER and get rendered as formatted text.
+    """
+    syntax = word
 
     # Check for prefixes and suffixes
     trailing_comma = False
-    trailing_curly_brace = False
+    trailing_brace = False
+    leading_brace = False
     if word[-1] == ",":
         trailing_comma = True
         word = word[:-1]
     if word[-1] == "}":  # Needs to be after ',' check
-        trailing_curly_brace = True
+        trailing_brace = True
         word = word[:-1]
     if word[0] == "{":
-        tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, "{"))
+        leading_brace = True
         word = word[1:]
 
-    # Format operand with numbers where the placeholders are
-    word_formatted = format_args_with_syntax(args, word)
-
-    # Add operand token
-    if word_formatted == "":
+    program = compile_syntax(word)
+    kind = OperandKind.OTHER
+    letter = ""
+    size = 0
+    shift = 0
+    lookup_type = ""
+    if word == "":
         # {}
-        pass
-    elif word_formatted[0] == "v":
-        # Register e.g. v01
-        val = int(word_formatted[1:], 16)
-        if val >= 256:
-            # TODO add link to issue. See comment in Smali
-            log_warn(
-                f"Rendering v{val}, but Binary Ninja only knows about registers up to 255 for analysis."
+        kind = OperandKind.EMPTY
+    elif word == "..":
+        kind = OperandKind.RANGE
+    elif len(program) == 1 and program[0][0] == "v":
+        # Register e.g. vAA
+        kind = OperandKind.REGISTER
+    elif (
+            1 < len(program) <= 3
+            and program[0][0] == "#"
+            and program[1][0] == "+"
+            and (
+                    len(program) == 2
+                    or (program[2][1] is None and program[2][0].strip("0") == "")
             )
-        tokens.append(
-            InstructionTextToken(InstructionTextTokenType.RegisterToken, f"v{val}")
+    ):
+        # Literal e.g. #+BBBB or #+BBBB0000
+        kind = OperandKind.LITERAL
+        if len(program) == 3:
+            shift = len(program[2][0]) * 4
+    elif len(program) == 2 and program[0][1] is None and program[1][0] == "@":
+        # Lookup value e.g. call_site@BBBB
+        lookup_type = program[0][0]
+        kind = _LOOKUP_KINDS.get(lookup_type, OperandKind.UNKNOWN_LOOKUP)
+    elif len(program) == 1 and program[0][0] == "+":
+        # Address offset e.g. +AAAA
+        kind = OperandKind.OFFSET
+
+    if kind not in (OperandKind.EMPTY, OperandKind.RANGE, OperandKind.OTHER):
+        substitution = program[-1] if kind != OperandKind.LITERAL else program[1]
+        if substitution[1] is None:
+            kind = OperandKind.OTHER
+        else:
+            letter = substitution[1]
+            size = substitution[2]
+
+    return SmaliOperand(
+        syntax=syntax,
+        kind=kind,
+        program=program,
+        letter=letter,
+        size=size,
+        shift=shift,
+        lookup_type=lookup_type,
+        leading_brace=leading_brace,
+        trailing_brace=trailing_brace,
+        trailing_comma=trailing_comma,
+    )
+
+
+def compile_operands(syntax: str) -> Tuple[SmaliOperand, ...]:
+    return tuple(
+        compile_operand(word)
+        for word in syntax.split(" ")
+        if word and not word.isspace()
+    )
+
+
+def _emit_empty(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    pass
+
+
+def _emit_register(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    val = args[operand.letter]
+    if val >= 256:
+        # TODO add link to issue. See comment in Smali
+        log_warn(
+            f"Rendering v{val}, but Binary Ninja only knows about registers up to 255 for analysis."
         )
-    elif word_formatted[:2] == "#+":
-        # Literal e.g. #+0001
-        tokens.append(
-            InstructionTextToken(
-                InstructionTextTokenType.IntegerToken, hex(int(word_formatted[2:], 16))
-            )
+    tokens.append(
+        InstructionTextToken(InstructionTextTokenType.RegisterToken, f"v{val}")
+    )
+
+
+def _emit_literal(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    val = sign(args[operand.letter], operand.size) << operand.shift
+    tokens.append(InstructionTextToken(InstructionTextTokenType.IntegerToken, hex(val)))
+
+
+def _emit_offset(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    val = sign(args[operand.letter], operand.size)
+    if val >= 0:
+        tokens.append(_TOK_PLUS)
+    tokens.append(
+        InstructionTextToken(InstructionTextTokenType.PossibleAddressToken, f"{val:x}")
+    )
+
+
+def _emit_range(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    tokens.append(_TOK_DOTDOT)
+
+
+def _emit_unimplemented_lookup(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    log_warn(operand.lookup_type + " isn't implemented yet")
+    tokens.append(
+        InstructionTextToken(
+            InstructionTextTokenType.TextToken,
+            f"{operand.lookup_type}@{args[operand.letter]:x}",
         )
-    elif "@" in word_formatted:
-        # Lookup value e.g. call_site@0001
-        # Possible lookup types: call_site, field, method, method_handle, proto, string, type
-        lookup_type, lookup_index_str = word_formatted.split("@")
-        lookup_index = int(lookup_index_str, 16)
-        if lookup_type == "call_site":
-            log_warn(lookup_type + " isn't implemented yet")
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, word_formatted)
-            )
-        elif lookup_type == "field":
-            field = df.field_ids[lookup_index]
+    )
+
+
+def _emit_field(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    index = args[operand.letter]
+    cache = _get_operand_tokens(df).fields
+    field_tokens = cache.get(index)
+    if field_tokens is None:
+        field = df.field_ids[index]
+        field_tokens = [
             # Class name
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, field.class_)
-            )
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, "->")
-            )
+            InstructionTextToken(InstructionTextTokenType.TextToken, field.class_),
+            _TOK_ARROW,
             # Field name
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, field.name)
-            )
-            tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, ":"))
+            InstructionTextToken(InstructionTextTokenType.TextToken, field.name),
+            _TOK_COLON,
             # Type
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, field.type_)
-            )
-        elif lookup_type == "meth":
-            meth = df.method_ids[lookup_index]
-            # Class and method names
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, meth.class_)
-            )
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, "->")
-            )
-
-            if meth._insns_off is not None:
-                tokens.append(
-                    InstructionTextToken(
-                        InstructionTextTokenType.PossibleAddressToken,
-                        meth.name,
-                        value=meth._insns_off,
-                    )
-                )
-            else:
-                tokens.append(
-                    InstructionTextToken(InstructionTextTokenType.TextToken, meth.name)
-                )
-            # Parameters
-            tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, "("))
-            for param in meth.proto.parameters:
-                tokens.append(
-                    InstructionTextToken(InstructionTextTokenType.TextToken, param)
-                )
-            # if meth.proto.parameters:
-            #     # Remove trailing semicolon
-            #     tokens.pop()
-            tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, ")"))
-            # Return type
-            tokens.append(
-                InstructionTextToken(
-                    InstructionTextTokenType.TextToken, meth.proto.return_type
-                )
-            )
-        elif lookup_type == "method_handle":
-            log_warn(lookup_type + " isn't implemented yet")
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, word_formatted)
-            )
-        elif lookup_type == "proto":
-            log_warn(lookup_type + " isn't implemented yet")
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, word_formatted)
-            )
-        elif lookup_type == "string":
-            string_ = df.strings[lookup_index]
-            tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, '"'))
-            tokens.append(
-                # Escape e.g \n -> \\n or binja will render literal newline
+            InstructionTextToken(InstructionTextTokenType.TextToken, field.type_),
+        ]
+        cache[index] = field_tokens
+    tokens.extend(field_tokens)
+
+
+def _emit_method(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    index = args[operand.letter]
+    cache = _get_operand_tokens(df).methods
+    method_tokens = cache.get(index)
+    if method_tokens is None:
+        meth = df.method_ids[index]
+        # Class and method names
+        method_tokens = [
+            InstructionTextToken(InstructionTextTokenType.TextToken, meth.class_),
+            _TOK_ARROW,
+        ]
+        if meth._insns_off is not None:
+            method_tokens.append(
                 InstructionTextToken(
-                    InstructionTextTokenType.TextToken,
-                    string_.encode("unicode-escape").decode(),
+                    InstructionTextTokenType.PossibleAddressToken,
+                    meth.name,
+                    value=meth._insns_off,
                 )
             )
-            tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, '"'))
-        elif lookup_type == "type":
-            type_ = df.type_ids[lookup_index]
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, type_)
-            )
         else:
-            log_error(f"Unknown lookup type: {word_formatted}")
-            tokens.append(
-                InstructionTextToken(InstructionTextTokenType.TextToken, word_formatted)
+            method_tokens.append(
+                InstructionTextToken(InstructionTextTokenType.TextToken, meth.name)
+            )
+        # Parameters
+        method_tokens.append(_TOK_LPAREN)
+        for param in meth.proto.parameters:
+            method_tokens.append(
+                InstructionTextToken(InstructionTextTokenType.TextToken, param)
             )
-    elif word_formatted[0] == "+":
-        # Address offset e.g. +0011
-        if int(word_formatted[1:], 16) >= 0:
-            tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, "+"))
-        tokens.append(
+        method_tokens.append(_TOK_RPAREN)
+        # Return type
+        method_tokens.append(
             InstructionTextToken(
-                InstructionTextTokenType.PossibleAddressToken, word_formatted[1:]
+                InstructionTextTokenType.TextToken, meth.proto.return_type
             )
         )
-    elif word_formatted == "..":
-        tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, ".."))
-    else:
-        # Other tokens. Investigate these
-        log_warn(f'Formatting unknown token with syntax: "{word}": {word_formatted}')
-        tokens.append(
-            InstructionTextToken(InstructionTextTokenType.TextToken, word_formatted)
+        cache[index] = method_tokens
+    tokens.extend(method_tokens)
+
+
+def _emit_string(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    index = args[operand.letter]
+    cache = _get_operand_tokens(df).strings
+    string_tokens = cache.get(index)
+    if string_tokens is None:
+        string_tokens = [
+            _TOK_QUOTE,
+            # Escape e.g \n -> \\n or binja will render literal newline
+            InstructionTextToken(
+                InstructionTextTokenType.TextToken, escape_string(df.strings[index])
+            ),
+            _TOK_QUOTE,
+        ]
+        cache[index] = string_tokens
+    tokens.extend(string_tokens)
+
+
+def _emit_type(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    index = args[operand.letter]
+    cache = _get_operand_tokens(df).types
+    type_token = cache.get(index)
+    if type_token is None:
+        type_token = InstructionTextToken(
+            InstructionTextTokenType.TextToken, df.type_ids[index]
         )
+        cache[index] = type_token
+    tokens.append(type_token)
+
+
+def _emit_unknown_lookup(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    word = format_args_with_program(args, operand.program)
+    log_error(f"Unknown lookup type: {word}")
+    tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, word))
+
+
+def _emit_other(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    # Other tokens. Investigate these
+    word = format_args_with_program(args, operand.program)
+    log_warn(f'Formatting unknown token with syntax: "{operand.syntax}": {word}')
+    tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, word))
+
+
+_EMITTERS: Dict[
+    OperandKind,
+    Callable[
+        ["DexFile", SmaliOperand, Dict[str, int], List[InstructionTextToken]], None
+    ],
+] = {
+    OperandKind.EMPTY: _emit_empty,
+    OperandKind.REGISTER: _emit_register,
+    OperandKind.LITERAL: _emit_literal,
+    OperandKind.OFFSET: _emit_offset,
+    OperandKind.RANGE: _emit_range,
+    OperandKind.CALL_SITE: _emit_unimplemented_lookup,
+    OperandKind.FIELD: _emit_field,
+    OperandKind.METHOD: _emit_method,
+    OperandKind.METHOD_HANDLE: _emit_unimplemented_lookup,
+    OperandKind.PROTO: _emit_unimplemented_lookup,
+    OperandKind.STRING: _emit_string,
+    OperandKind.TYPE: _emit_type,
+    OperandKind.UNKNOWN_LOOKUP: _emit_unknown_lookup,
+    OperandKind.OTHER: _emit_other,
+}
+
+
+def tokenize_operand(
+        df: "DexFile",
+        operand: SmaliOperand,
+        args: Dict[str, int],
+        tokens: List[InstructionTextToken],
+) -> None:
+    """Append tokens for a compiled operand to tokens."""
+    tokens.append(_TOK_SPACE)
+    if operand.leading_brace:
+        tokens.append(_TOK_LBRACE)
+
+    _EMITTERS[operand.kind](df, operand, args, tokens)
 
     # Add suffixes
-    if trailing_curly_brace:
-        tokens.append(InstructionTextToken(InstructionTextTokenType.TextToken, "}"))
-    if trailing_comma:
-        tokens.append(
-            InstructionTextToken(InstructionTextTokenType.OperandSeparatorToken, ",")
-        )
+    if operand.trailing_brace:
+        tokens.append(_TOK_RBRACE)
+    if operand.trailing_comma:
+        tokens.append(_TOK_COMMA)
+
+
+def tokenize_syntax(
+        df: "DexFile", word: str, args: Dict[str, int]
+) -> List[InstructionTextToken]:
+    """Tokenize one word of a syntax string.
+
+    Instruction syntax strings are compiled once in load_insns(). This is
+    for one-off strings.
+    """
+    tokens: List[InstructionTextToken] = list()
+    tokenize_operand(df, compile_operand(word), args, tokens)
     return tokens
 
 
 def disassemble(
         df: "DexFile", data: bytes, addr: "FileOffset"
 ) -> Tuple[List[InstructionTextToken], int]:
-    # Static variable
-    if "insns" not in disassemble.__dict__:
-        # https://github.com/python/mypy/issues/708
-        disassemble.insns = load_insns()  # type: ignore[attr-defined]
-
     if len(data) < 2:
         log_warn(
             f"Trying to disassemble data of length {len(data)} at {addr}: {data!r}"
@@ -447,67 +915,35 @@ def disassemble(
         )
 
     # Now handle normal instructions
-    tokens = list()
-    insn_info = disassemble.insns[data[0]]  # type: ignore[attr-defined]
-    tokens.append(
-        InstructionTextToken(
-            InstructionTextTokenType.InstructionToken, insn_info.mnemonic
-        )
-    )
-
-    data_to_parse = endian_swap_shorts(data[: 2 * insn_info.fmt.insn_len])
-    if len(data_to_parse) != insn_info.fmt.insn_len * 2:
+    insn_info = get_insns()[data[0]]
+    if len(data) < insn_info.fmt.insn_len * 2:
         log_error(
             "Disassembly failed. Too few bytes part of instruction available to parse"
         )
         return list(), insn_info.fmt.insn_len * 2
-    args = parse_with_format(data_to_parse, insn_info.fmt.format_)
+    args = insn_info.fmt._parser(data)
     if "r" in insn_info._formatid:
         # Range instructions
         args["N"] = args["A"] + args["C"] - 1
 
-    # Fix up syntax
-    if insn_info._formatid == "35c":
-        # 35c is weird for a couple reasons
-        # 1. It uses "kind" instead of the actual kind of the name of the
-        #    constant pool
-        # 2. It forgets about "kind" for A=5 and lists them all out
-        m = re.search("\\s([a-z]+)@", insn_info.syntax)
-        if m is None:
-            log_error(f"Failed to parse 35c at {addr}")
-        else:
-            kind = m.group(1)
-        if args["A"] == 5:
-            syntax = f"{{vC, vD, vE, vF, vG}}, {kind}@BBBB"
-        elif args["A"] == 4:
-            syntax = f"{{vC, vD, vE, vF}}, {kind}@BBBB"
-        elif args["A"] == 3:
-            syntax = f"{{vC, vD, vE}}, {kind}@BBBB"
-        elif args["A"] == 2:
-            syntax = f"{{vC, vD}}, {kind}@BBBB"
-        elif args["A"] == 1:
-            syntax = f"{{vC}}, {kind}@BBBB"
-        elif args["A"] == 0:
-            syntax = f"{{}}, {kind}@BBBB"
-        else:
-            log_error(f"Failed to parse syntax for 35c instruction at {addr}")
-            syntax = "error (35c)"
-    elif "[A=" in insn_info.fmt.syntax:
-        for line in insn_info.fmt.syntax.split("[A="):
-            line = line.strip()
-            if line and line[0] == str(args["A"]):
-                syntax = line[6:]
-                break
-        else:
-            log_error(f"Failed to parse syntax for instruction at {addr}")
-            syntax = "error"
+    tokens = [
+        InstructionTextToken(
+            InstructionTextTokenType.InstructionToken, insn_info.mnemonic
+        )
+    ]
+    if insn_info._operands_by_A is None:
+        operands = insn_info._operands
     else:
-        syntax = insn_info.syntax
+        operands_for_A = insn_info._operands_by_A[args["A"]]
+        if operands_for_A is None:
+            log_error(f"Failed to parse syntax for instruction at {addr}")
+            syntax = "error (35c)" if insn_info._formatid == "35c" else "error"
+            operands = compile_operands(syntax)
+        else:
+            operands = operands_for_A
 
-    for word in syntax.split(" "):
-        if not word or word.isspace():
-            continue
-        tokens += tokenize_syntax(df, word, args)
+    for operand in operands:
+        tokenize_operand(df, operand, args, tokens)
 
     return tokens, insn_info.fmt.insn_len * 2
 
@@ -515,62 +951,66 @@ def disassemble(
 def disassemble_pseudoinstructions(
         data: bytes, addr: "FileOffset"
 ) -> PseudoInstructions:
-    # Static variable
-    if "insns" not in disassemble.__dict__:
-        disassemble.insns = load_insns()  # type: ignore[attr-defined]
-
     pseudoinstructions: PseudoInstructions = cast(PseudoInstructions, dict())
+
+    # Payloads start with a nop opcode that has a non-zero high byte. Most code
+    # has none, so check for one before walking every instruction
+    opcodes = data[1::2]
+    nop = opcodes.find(0)
+    while nop != -1 and data[nop * 2] == 0:
+        nop = opcodes.find(0, nop + 1)
+    if nop == -1:
+        return pseudoinstructions
+
+    insn_lengths = get_insn_lengths()
+    data_swapped = endian_swap_shorts(data)
     code_offset = 0
     while code_offset < len(data):
         if data[code_offset + 1] == 0 and data[code_offset] != 0:
             # Pseudo-instruction
-            # TODO performance benchmark swapping here vs. doing it once at
-            # beginning of function
-            data_swapped = endian_swap_shorts(data[code_offset + 2:])
+            payload = code_offset + 2
             if data[code_offset] == 1:
                 # packed-switch-payload
-                size = unpack("<H", data_swapped[:2])[0]
+                size = unpack_from("<H", data_swapped, payload)[0]
                 pseudoinstructions[
                     cast("FileOffset", addr + code_offset)
                 ] = SmaliPackedSwitchPayload(
                     _total_size=size * 4 + 8,
                     size=size,
-                    first_key=unpack("<i", data_swapped[2:6])[0],
-                    targets=[
-                        unpack("<i", data_swapped[i: i + 4])[0]
-                        for i in range(6, 6 + size * 4, 4)
-                    ],
+                    first_key=unpack_from("<i", data_swapped, payload + 2)[0],
+                    targets=list(
+                        int_array_struct(size).unpack_from(data_swapped, payload + 6)
+                    ),
                 )
                 code_offset += size * 4 + 8
             elif data[code_offset] == 2:
                 # sparse-switch-payload
-                size = unpack("<H", data_swapped[:2])[0]
+                size = unpack_from("<H", data_swapped, payload)[0]
+                ints = int_array_struct(size)
                 pseudoinstructions[
                     cast("FileOffset", addr + code_offset)
                 ] = SmaliSparseSwitchPayload(
                     _total_size=size * 8 + 4,
                     size=size,
-                    keys=[
-                        unpack("<i", data_swapped[i: i + 4])[0]
-                        for i in range(2, 2 + size * 4, 4)
-                    ],
-                    targets=[
-                        unpack("<i", data_swapped[i: i + 4])[0]
-                        for i in range(2 + size * 4, 2 + size * 8, 4)
-                    ],
+                    keys=list(ints.unpack_from(data_swapped, payload + 2)),
+                    targets=list(
+                        ints.unpack_from(data_swapped, payload + 2 + size * 4)
+                    ),
                 )
                 code_offset += size * 8 + 4
             elif data[code_offset] == 3:
                 # fill-array-data-payload
-                element_width = unpack("<H", data_swapped[:2])[0]
-                size = unpack("<I", data_swapped[2:6])[0]
+                element_width = unpack_from("<H", data_swapped, payload)[0]
+                size = unpack_from("<I", data_swapped, payload + 2)[0]
                 pseudoinstructions[
                     cast("FileOffset", addr + code_offset)
                 ] = SmaliFillArrayDataPayload(
                     _total_size=((size * element_width + 1) // 2) * 2 + 8,
                     element_width=element_width,
                     size=size,
-                    data=data_swapped[6: 8 + ((element_width * size + 1) // 2) * 2],
+                    data=data_swapped[
+                        payload + 6: payload + 8 + ((element_width * size + 1) // 2) * 2
+                    ],
                 )
                 code_offset += ((size * element_width + 1) // 2) * 2 + 8
             else:
@@ -580,12 +1020,41 @@ def disassemble_pseudoinstructions(
                 code_offset += 2
         else:
             # Normal instruction
-            insn_info = disassemble.insns[data[code_offset + 1]]  # type: ignore[attr-defined]
-            code_offset += insn_info.fmt.insn_len * 2
+            code_offset += insn_lengths[data[code_offset + 1]]
     return pseudoinstructions
 
 
+def resolve_syntax(insn: SmaliInstructionInfo, a: int) -> Optional[str]:
+    """Get syntax for instructions where it depends on the value of A.
+
+    Returns None if insn doesn't have a syntax for this value of A.
+    """
+    if insn._formatid == "35c":
+        # 35c is weird for a couple reasons
+        # 1. It uses "kind" instead of the actual kind of the name of the
+        #    constant pool
+        # 2. It forgets about "kind" for A=5 and lists them all out
+        m = _KIND_RE.search(insn.syntax)
+        if m is None or a > 5:
+            return None
+        registers = ", ".join(["vC", "vD", "vE", "vF", "vG"][:a])
+        return f"{{{registers}}}, {m.group(1)}@BBBB"
+    for line in insn.fmt.syntax.split("[A="):
+        line = line.strip()
+        if line and line[0] == str(a):
+            return line[6:]
+    return None
+
+
 class SmaliUnpickler(pickle.Unpickler):
+    """Unpickler that maps classes to this module.
+
+    generate_instruction_info.py is run as a script, so the pickle refers to
+    the classes as smali.<name>, but this module may be imported as
+    android.smali or as part of the plugin package. Classes are memoized by
+    the unpickler, so this is only called once per class.
+    """
+
     def find_class(self, module: str, name: str) -> Any:
         if name == "SmaliInstructionFormat":
             return SmaliInstructionFormat
@@ -594,7 +1063,8 @@ class SmaliUnpickler(pickle.Unpickler):
         return super().find_class(module, name)
 
 
-def load_insns() -> Dict[int, SmaliInstructionInfo]:
+def load_insns() -> Tuple[SmaliInstructionInfo, ...]:
+    """Load instruction info, indexed by opcode."""
     if not INSTRUCTIONS_PICKLE_PATH.is_file():
         log_warn(
             "Instructions cache does not exist. Generating now (requires internet access)"
@@ -602,5 +1072,35 @@ def load_insns() -> Dict[int, SmaliInstructionInfo]:
         from .generate_instruction_info import gen_instruction_info
 
         gen_instruction_info()
-    with INSTRUCTIONS_PICKLE_PATH.open("br") as f:
-        return cast(Dict[int, SmaliInstructionInfo], SmaliUnpickler(f).load())
+    # Unpickling from memory avoids the small reads made on a file object
+    data = io.BytesIO(INSTRUCTIONS_PICKLE_PATH.read_bytes())
+    insns = cast(Dict[int, SmaliInstructionInfo], SmaliUnpickler(data).load())
+    parsers: Dict[str, Callable[[bytes], Dict[str, int]]] = dict()
+    for insn in insns.values():
+        if insn.fmt.format_ not in parsers:
+            parsers[insn.fmt.format_] = compile_format(insn.fmt.format_)
+        insn.fmt._parser = parsers[insn.fmt.format_]
+        insn._operands = compile_operands(insn.syntax)
+        if insn._formatid == "35c" or "[A=" in insn.fmt.syntax:
+            syntax_by_A = [resolve_syntax(insn, a) for a in range(16)]
+            insn._operands_by_A = tuple(
+                None if syntax is None else compile_operands(syntax)
+                for syntax in syntax_by_A
+            )
+        else:
+            insn._operands_by_A = None
+    return tuple(insns[opcode] for opcode in range(256))
+
+
+# Loaded on first use instead of on import, since generate_instruction_info
+# imports this module and load_insns() may need to run it
+@functools.lru_cache(maxsize=None)
+def get_insns() -> Tuple[SmaliInstructionInfo, ...]:
+    """Instruction info indexed by opcode, loaded once by load_insns()."""
+    return load_insns()
+
+
+@functools.lru_cache(maxsize=None)
+def get_insn_lengths() -> Tuple[int, ...]:
+    """Instruction length in bytes, indexed by opcode."""
+    return tuple(insn.fmt.insn_len * 2 for insn in get_insns())
@@ -19,9 +19,7 @@ from .android.dex import DexFile, FileOffset
 from .android.smali import (
     SmaliPackedSwitchPayload,
     disassemble,
-    endian_swap_shorts,
-    load_insns,
-    parse_with_format,
+    get_insns,
     sign,
 )
 
@@ -29,7 +27,7 @@ from .android.smali import (
 class Smali(Architecture):  # type: ignore
     """Architecture class for disassembling Dalvik bytecode into Smali
 
-    Initializing the class calls android.smali.load_insns(), which imports
+    Initializing the class calls android.smali.get_insns(), which imports
     cached instruction information from "android/instruction_data.pickle".
 
     The three mandatory Architecture functions are implemented:
@@ -55,7 +53,7 @@ class Smali(Architecture):  # type: ignore
     instr_alignment = 2
 
     def __init__(self) -> None:
-        self.insns = load_insns()
+        self.insns = get_insns()
         super().__init__()
 
     def load_dex(self) -> None:
@@ -87,31 +85,27 @@ class Smali(Architecture):  # type: ignore
             ii.add_branch(BranchType.ExceptionBranch)
             # TODO
         elif insn_info.mnemonic.startswith("goto"):
-            data_to_parse = endian_swap_shorts(data[: 2 * insn_info.fmt.insn_len])
-            args = parse_with_format(data_to_parse, insn_info.fmt.format_)
+            args = insn_info.fmt._parser(data)
             offset = sign(args["A"], insn_info.fmt.format_.count("A"))
             ii.add_branch(BranchType.UnconditionalBranch, target=addr + offset * 2)
         elif (
                 insn_info.mnemonic == "packed-switch"
                 or insn_info.mnemonic == "sparse-switch"
         ):
-            data_to_parse = endian_swap_shorts(data[: 2 * insn_info.fmt.insn_len])
-            args = parse_with_format(data_to_parse, insn_info.fmt.format_)
+            args = insn_info.fmt._parser(data)
             offset = sign(args["B"], insn_info.fmt.format_.count("B"))
             ii.add_branch(BranchType.UnresolvedBranch)
             # Adding more than 2 branches causes binja to segfault, so this has
             # to be handled in LLIL instead.
         elif insn_info.mnemonic == "fill-array-data":
-            data_to_parse = endian_swap_shorts(data[: 2 * insn_info.fmt.insn_len])
-            args = parse_with_format(data_to_parse, insn_info.fmt.format_)
+            args = insn_info.fmt._parser(data)
             offset = sign(args["B"], insn_info.fmt.format_.count("B"))
             ii.add_branch(BranchType.TrueBranch, target=addr + offset * 2)
             ii.add_branch(
                 BranchType.FalseBranch, target=addr + insn_info.fmt.insn_len * 2
             )
         elif insn_info.mnemonic.startswith("if-"):
-            data_to_parse = endian_swap_shorts(data[: 2 * insn_info.fmt.insn_len])
-            args = parse_with_format(data_to_parse, insn_info.fmt.format_)
+            args = insn_info.fmt._parser(data)
             var = "C" if "C" in args else "B"
             offset = sign(args[var], insn_info.fmt.format_.count(var))
             ii.add_branch(BranchType.TrueBranch, target=addr + offset * 2)
@@ -123,8 +117,7 @@ class Smali(Architecture):  # type: ignore
                 log_warn("Resolution of invoke-custom is not implemented")
                 ii.add_branch(BranchType.UnresolvedBranch)
             else:
-                data_to_parse = endian_swap_shorts(data[: 2 * insn_info.fmt.insn_len])
-                args = parse_with_format(data_to_parse, insn_info.fmt.format_)
+                args = insn_info.fmt._parser(data)
                 meth = self.df.method_ids[args["B"]]
                 if meth._insns_off is not None:
                     ii.add_branch(BranchType.CallDestination, target=meth._insns_off)
@@ -142,8 +135,7 @@ class Smali(Architecture):  # type: ignore
         self.load_dex()
         insn_info = self.insns[data[0]]
         if data[0] == 0x2B or data[0] == 0x2C and False:
-            data_to_parse = endian_swap_shorts(data[: 2 * insn_info.fmt.insn_len])
-            args = parse_with_format(data_to_parse, insn_info.fmt.format_)
+            args = insn_info.fmt._parser(data)
             offset = sign(args["B"], insn_info.fmt.format_.count("B"))
             branches = list()  # [addr + offset * 2, addr + insn_info.fmt.insn_len * 2]
             if data[0] == 0x2B:  # packed-switch
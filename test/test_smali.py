@@ -44,6 +44,36 @@ class TestFormatParsing(unittest.TestCase):
         )
 
 
+class TestFormatCompiling(unittest.TestCase):
+    """Same cases as TestFormatParsing, but with unswapped data"""
+
+    def test_10x(self) -> None:
+        self.assertEqual(compile_format("ØØ|op")(b"\x0e\x00"), {})
+
+    def test_11n(self) -> None:
+        self.assertEqual(compile_format("B|A|op")(b"\x12\x10"), {"A": 0, "B": 1})
+
+    def test_31i(self) -> None:
+        self.assertEqual(
+            compile_format("AA|op BBBBlo BBBBhi")(b"\x14\x01\xff\xff\xff\x00"),
+            {"A": 1, "B": 0x00FFFFFF},
+        )
+
+    def test_35c(self) -> None:
+        self.assertEqual(
+            compile_format("A|G|op BBBB F|E|D|C")(b"\x70\x10\x07\x00\x21\x43"),
+            {"A": 1, "B": 7, "C": 1, "D": 2, "E": 3, "F": 4, "G": 0},
+        )
+
+    def test_51l(self) -> None:
+        self.assertEqual(
+            compile_format("AA|op BBBBlo BBBB BBBB BBBBhi")(
+                b"\x18\x01\x02\x01\x04\x03\x06\x05\x08\x07"
+            ),
+            {"A": 1, "B": 0x0708050603040102},
+        )
+
+
 class TestFormattingArgsWithSyntax(unittest.TestCase):
     def test_no_format(self) -> None:
         self.assertEqual(format_args_with_syntax({}, "hi there"), "hi there")
@@ -99,6 +129,16 @@ class TestFormattingArgsWithSyntax(unittest.TestCase):
             format_args_with_syntax({"A": 0xF}, "positive vAA"), "positive vf"
         )
 
+    def test_same_as_regex(self) -> None:
+        """Edge cases of the ".[A-Z]+" regex this used to be implemented with"""
+        # The first character is never replaced, even if it's a capital
+        self.assertEqual(format_args_with_syntax({"B": 1}, "AB"), "A1")
+        self.assertEqual(format_args_with_syntax({"A": 1}, "A"), "A")
+        # Groups aren't replaced after a newline
+        self.assertEqual(format_args_with_syntax({"A": 1}, "x\nA"), "x\nA")
+        # Mixed letters use the last one
+        self.assertEqual(format_args_with_syntax({"B": 2}, "vAB"), "v2")
+
 
 class TestNibbleSlicing(unittest.TestCase):
     def test_single_even(self) -> None:
@@ -138,3 +178,128 @@ class TestNibbleSlicing(unittest.TestCase):
             slice_nibbles(b"\x00\x12\x34\x56\x78\x9a\xbc\xde\xf0", 2, 16),
             0xDEF09ABC56781234,
         )
+
+
+class TestEndianSwap(unittest.TestCase):
+    def test_empty(self) -> None:
+        self.assertEqual(endian_swap_shorts(b""), b"")
+
+    def test_shorts(self) -> None:
+        self.assertEqual(
+            endian_swap_shorts(b"\x12\x34\x56\x78\x9a\xbc"), b"\x34\x12\x78\x56\xbc\x9a"
+        )
+
+
+class TestSyntaxCompiling(unittest.TestCase):
+    def test_literal(self) -> None:
+        self.assertEqual(compile_syntax("hi there"), [("hi there", None, 0, False)])
+        self.assertEqual(compile_syntax(""), [])
+
+    def test_register(self) -> None:
+        self.assertEqual(
+            compile_syntax("vAA, vBBBB"),
+            [("v", "A", 2, False), (", ", None, 0, False), ("v", "B", 4, False)],
+        )
+
+    def test_signed(self) -> None:
+        self.assertEqual(
+            compile_syntax("#+BBBB0000"),
+            [("#", None, 0, False), ("+", "B", 4, True), ("0000", None, 0, False)],
+        )
+
+    def test_lookup(self) -> None:
+        self.assertEqual(
+            compile_syntax("string@BBBB"),
+            [("string", None, 0, False), ("@", "B", 4, False)],
+        )
+
+
+class TestPseudoInstructions(unittest.TestCase):
+    def test_no_payloads(self) -> None:
+        # nop, const/4 v0, #+1, return-void
+        self.assertEqual(
+            disassemble_pseudoinstructions(b"\x00\x00\x10\x12\x00\x0e", 0x10), {}
+        )
+
+    def test_packed_switch(self) -> None:
+        # return-void, packed-switch-payload with keys 5..6
+        data = (
+            b"\x00\x0e\x01\x00\x00\x02\x00\x05\x00\x00"
+            b"\x00\x03\x00\x00\xff\xfe\xff\xff"
+        )
+        self.assertEqual(
+            disassemble_pseudoinstructions(data, 0x10),
+            {
+                0x12: SmaliPackedSwitchPayload(
+                    _total_size=16, size=2, first_key=5, targets=[3, -2]
+                )
+            },
+        )
+
+
+class TestResolveSyntax(unittest.TestCase):
+    def test_35c(self) -> None:
+        invoke_virtual = get_insns()[0x6E]
+        self.assertEqual(resolve_syntax(invoke_virtual, 0), "{}, meth@BBBB")
+        self.assertEqual(resolve_syntax(invoke_virtual, 2), "{vC, vD}, meth@BBBB")
+        self.assertIsNone(resolve_syntax(invoke_virtual, 6))
+
+    def test_45cc(self) -> None:
+        invoke_polymorphic = get_insns()[0xFA]
+        self.assertEqual(
+            resolve_syntax(invoke_polymorphic, 1), "{vC}, meth@BBBB, proto@HHHH"
+        )
+        self.assertIsNone(resolve_syntax(invoke_polymorphic, 0))
+
+
+class TestOperandCompiling(unittest.TestCase):
+    def test_register(self) -> None:
+        operand = compile_operand("{vC,")
+        self.assertEqual(operand.kind, OperandKind.REGISTER)
+        self.assertEqual((operand.letter, operand.size), ("C", 1))
+        self.assertTrue(operand.leading_brace)
+        self.assertFalse(operand.trailing_brace)
+        self.assertTrue(operand.trailing_comma)
+
+    def test_empty(self) -> None:
+        operand = compile_operand("{},")
+        self.assertEqual(operand.kind, OperandKind.EMPTY)
+        self.assertTrue(operand.leading_brace)
+        self.assertTrue(operand.trailing_brace)
+
+    def test_literal(self) -> None:
+        operand = compile_operand("#+BBBB0000")
+        self.assertEqual(operand.kind, OperandKind.LITERAL)
+        self.assertEqual((operand.letter, operand.size, operand.shift), ("B", 4, 16))
+
+    def test_lookup(self) -> None:
+        self.assertEqual(compile_operand("meth@BBBB,").kind, OperandKind.METHOD)
+        operand = compile_operand("call_site@BBBB")
+        self.assertEqual(operand.kind, OperandKind.CALL_SITE)
+        self.assertEqual(operand.lookup_type, "call_site")
+        self.assertEqual(compile_operand("kind@BBBB").kind, OperandKind.UNKNOWN_LOOKUP)
+
+    def test_offset(self) -> None:
+        self.assertEqual(compile_operand("+AAAA").kind, OperandKind.OFFSET)
+
+    def test_other(self) -> None:
+        self.assertEqual(compile_operand("error").kind, OperandKind.OTHER)
+        self.assertEqual(compile_operand("(35c)").kind, OperandKind.OTHER)
+
+
+class TestEscapeString(unittest.TestCase):
+    def test_whitespace(self) -> None:
+        self.assertEqual(escape_string("a\nb\tc\r"), "a\\nb\\tc\\r")
+
+    def test_quotes_and_backslashes(self) -> None:
+        self.assertEqual(escape_string('say "\\hi"'), 'say \\"\\\\hi\\"')
+
+    def test_control(self) -> None:
+        self.assertEqual(escape_string("\x00\x7f"), "\\x00\\x7f")
+
+    def test_unicode(self) -> None:
+        self.assertEqual(escape_string("héllo ☃"), "héllo ☃")
+
+    def test_surrogates(self) -> None:
+        self.assertEqual(escape_string("ab\ud800"), "ab\\ud800")
+        self.assertEqual(escape_string("\udfff"), "\\udfff")